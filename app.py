@@ -1,9 +1,30 @@
 import streamlit as st
 import json
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import re
-from collections import defaultdict
+import os
+import sys
+import functools
+import hashlib
+import io
+import multiprocessing
+import queue
+import threading
+import traceback
+import mmap
+from collections import Counter, defaultdict
+from itertools import islice
+
+try:
+    import orjson
+except ImportError:  # fall back to the hand-written parser below
+    orjson = None
+
+# The hand-written Tokenizer/Parser is kept for teaching purposes; by default
+# parsing goes through orjson (C implementation) when it is installed.
+USE_PUREPY_PARSER = orjson is None
 
 # ============================================================================
 # JSON Tokenizer & Parser (from final_code.ipynb)
@@ -15,8 +36,11 @@ class Token:
     def __init__(self, t, v, pos):
         self.type, self.value, self.pos = t, v, pos
 
+_WS_RE = re.compile(r'[ \t\r\n]*')
+_NUM_RE = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+\-]?[0-9]+)?')
+
 class Tokenizer:
-    ws = set(" \t\r\n")
+    escapes = {'"':'"', '\\':'\\', '/':'/', 'b':'\b', 'f':'\f', 'n':'\n', 'r':'\r', 't':'\t'}
     def __init__(self, text):
         self.text, self.n, self.i = text, len(text), 0
 
@@ -29,50 +53,43 @@ class Tokenizer:
         return ch
 
     def skip_ws(self):
-        while self.i < self.n and self.text[self.i] in self.ws:
-            self.i += 1
+        # one C-level regex scan instead of a Python loop per whitespace char
+        self.i = _WS_RE.match(self.text, self.i).end()
 
     def read_str(self, start):
-        self.next()  # skip opening quote
+        # copy the clean spans between escapes as slices instead of char by char;
+        # a string without escapes (the common case) is a single slice
+        text = self.text
+        i = self.i + 1  # skip opening quote
         out = []
         while True:
-            if self.i >= self.n:
+            j = text.find('"', i)
+            if j == -1:
                 raise SyntaxError(f"String not closed (from {start})")
-            ch = self.next()
-            if ch == '"':
-                break
-            if ch == '\\':
-                if self.i >= self.n:
-                    raise SyntaxError("Bad escape sequence")
-                esc = self.next()
-                m = {'"':'"', '\\':'\\', '/':'/', 'b':'\b', 'f':'\f', 'n':'\n', 'r':'\r', 't':'\t'}
-                if esc in m:
-                    out.append(m[esc])
-                else:
-                    raise SyntaxError(f"Unknown escape \\{esc}")
-            else:
-                out.append(ch)
-        return ''.join(out)
+            k = text.find('\\', i, j)
+            if k == -1:
+                self.i = j + 1
+                if not out:
+                    return text[i:j]
+                out.append(text[i:j])
+                return ''.join(out)
+            out.append(text[i:k])
+            esc = text[k + 1]#k < j, so the escaped char exists
+            if esc not in self.escapes:
+                raise SyntaxError(f"Unknown escape \\{esc}")
+            out.append(self.escapes[esc])
+            i = k + 2
 
     def read_num(self, start):
-        j = self.i
-        if self.peek() == '-':
-            self.next()
-        if self.peek() == '0':
-            self.next()
-        else:
-            if not self.peek().isdigit():
-                raise SyntaxError(f"Bad number at {start}")
-            while self.peek().isdigit():
-                self.next()
-        if self.peek() == '.':
-            self.next()
-            if not self.peek().isdigit():
-                raise SyntaxError("Bad decimal")
-            while self.peek().isdigit():
-                self.next()
-        s = self.text[j:self.i]
-        return float(s) if '.' in s else int(s)
+        # one anchored C-level regex match instead of a Python loop over digits
+        m = _NUM_RE.match(self.text, self.i)
+        if m is None:
+            raise SyntaxError(f"Bad number at {start}")
+        if self.text.startswith('.', m.end()):
+            raise SyntaxError("Bad decimal")
+        self.i = m.end()
+        s = m.group()
+        return float(s) if '.' in s or 'e' in s or 'E' in s else int(s)
 
     def read_kw(self, start): #read keyword:true, false,null 
         for k, v in [("true", True), ("false", False), ("null", None)]:
@@ -81,38 +98,59 @@ class Tokenizer:
                 return v
         raise SyntaxError(f"Unknown literal near {start}")
 
-    def tokens(self):
+    def tokenize_all(self):
+        # materialize every token up front; the parser then indexes a list
+        # instead of resuming a generator once per token
+        toks = []
+        append = toks.append
         while True:
             self.skip_ws()
             if self.i >= self.n:
-                yield Token("EOF", None, self.i) #end of file
-                return
-            ch = self.peek()
+                append(Token("EOF", None, self.i)) #end of file
+                return toks
             pos = self.i
-            if ch in '{}[]:,':
-                self.next()
-                yield Token(ch, ch, pos)
-            elif ch == '"':
-                yield Token("STR", self.read_str(pos), pos)#string
-            elif ch in '-0123456789':
-                yield Token("NUM", self.read_num(pos), pos)#number
-            else:
-                yield Token("KW", self.read_kw(pos), pos)#keyword
+            code = ord(self.text[pos])
+            handler = _DISPATCH[code] if code < 256 else _emit_kw
+            append(handler(self, pos))
+
+    def tokens(self):
+        return iter(self.tokenize_all())
+
+# token dispatch table indexed by character code (replaces the `ch in '...'` chain)
+def _emit_punct(tz, pos):
+    ch = tz.text[pos]
+    tz.i = pos + 1
+    return Token(ch, ch, pos)
+
+def _emit_str(tz, pos):
+    return Token("STR", tz.read_str(pos), pos)#string
+
+def _emit_num(tz, pos):
+    return Token("NUM", tz.read_num(pos), pos)#number
+
+def _emit_kw(tz, pos):
+    return Token("KW", tz.read_kw(pos), pos)#keyword
+
+_DISPATCH = [_emit_kw] * 256
+for _ch in '{}[]:,':
+    _DISPATCH[ord(_ch)] = _emit_punct
+_DISPATCH[ord('"')] = _emit_str
+for _ch in '-0123456789':
+    _DISPATCH[ord(_ch)] = _emit_num
 
 #focus on the relationship between tokens
 class Stream:
     def __init__(self, tokenizer):
-        self.gen, self.buf = tokenizer.tokens(), []
+        # token list + integer cursor; the list always ends with an EOF token
+        self.toks, self.pos = tokenizer.tokenize_all(), 0
 
     def peek(self):
-        if not self.buf:
-            self.buf.append(next(self.gen))
-        return self.buf[0]
+        return self.toks[self.pos]
 
     def next(self):
-        if self.buf:
-            return self.buf.pop(0)
-        return next(self.gen)
+        tok = self.toks[self.pos]
+        self.pos += 1
+        return tok
 
     def expect(self, t):
         tok = self.next()
@@ -120,8 +158,67 @@ class Stream:
             raise SyntaxError(f"Expect {t} at {tok.pos}, got {tok.type}")
         return tok
 
+# Object keys repeat in every record; like orjson, keep one shared str per short
+# key (up to 2048 keys of <= 64 chars, oldest evicted first).
+# Lookups are lock-free; inserts take the lock so concurrent parses (prefetch
+# thread, Streamlit sessions) can't evict the same oldest key twice.
+_KEY_CACHE = {}
+_KEY_CACHE_LOCK = threading.Lock()
+
+def _cached_key(k):
+    cached = _KEY_CACHE.get(k)
+    if cached is not None:
+        return cached
+    if len(k) <= 64:
+        k = sys.intern(k)
+        with _KEY_CACHE_LOCK:
+            if k not in _KEY_CACHE:
+                if len(_KEY_CACHE) >= 2048:
+                    del _KEY_CACHE[next(iter(_KEY_CACHE))]
+                _KEY_CACHE[k] = k
+    return k
+
+# orjson turns integers beyond 64 bits into floats, so text holding a run of 20+
+# digits (needed to write one) is parsed by the stdlib json module, which keeps
+# them exact. Runs inside strings trigger it too; that only costs speed.
+_LONG_DIGITS_RE = re.compile(rb'[0-9]{20}')
+_LONG_DIGITS_STR_RE = re.compile(r'[0-9]{20}')
+
+def _has_long_digit_run(buf, block=1 << 20):
+    """
+    True if buf (str, bytes, mmap or memoryview) holds 20+ consecutive digits.
+    Large buffers are scanned in place with numpy, block by block, so an mmap
+    is never copied; the regex is only used on short text (e.g. one JSONL line).
+    """
+    if isinstance(buf, str):
+        return _LONG_DIGITS_STR_RE.search(buf) is not None
+    if len(buf) < 4096:
+        return _LONG_DIGITS_RE.search(buf) is not None
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    for i in range(0, len(arr), block):
+        digits = (arr[i:i + block + 19] - 48) < 10#overlap: a run starting in this block fits
+        if not digits.any():
+            continue
+        edges = np.flatnonzero(np.diff(digits, prepend=False, append=False))
+        if (edges[1::2] - edges[::2] >= 20).any():
+            return True
+    return False
+
 class Parser:
+    def __init__(self, check_ints=True):
+        # False when the caller already scanned the whole buffer and found no long digit run
+        self.check_ints = check_ints
+
     def parse(self, text):
+        if not USE_PUREPY_PARSER:
+            if self.check_ints and _has_long_digit_run(text):
+                return json.loads(text if isinstance(text, (str, bytes)) else bytes(text))
+            try:
+                return orjson.loads(text)
+            except orjson.JSONDecodeError:#retry below; raises the parser's own error if invalid
+                pass
+        if not isinstance(text, str):#bytes / memoryview
+            text = str(text, "utf-8")
         ts = Stream(Tokenizer(text))
         val = self.value(ts)
         if ts.peek().type != "EOF":
@@ -144,7 +241,7 @@ class Parser:
             ts.next()
             return o
         while True:
-            k = ts.expect("STR").value
+            k = _cached_key(ts.expect("STR").value)
             ts.expect(':')
             o[k] = self.value(ts)
             t = ts.peek()
@@ -177,145 +274,362 @@ class Parser:
 # Collection Class (from final_code.ipynb)
 # ============================================================================
 
+@functools.lru_cache(maxsize=1024)
+def _split_key(key):
+    # dotted key -> tuple of path parts, split once per distinct key
+    return tuple(key.split("."))
+
+def _walk_lines(var, key):
+    # generated source that walks dotted key from doc into var, None if any part is missing
+    first, *rest = _split_key(key)
+    lines = ["    %s = doc.get(%r)" % (var, first)]
+    for part in rest:
+        lines.append("    %s = %s.get(%r) if isinstance(%s, dict) else None" % (var, var, part, var))
+    return lines
+
+def _exec_function(lines, name):
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    return namespace[name]
+
+@functools.lru_cache(maxsize=1024)
+def _compile_accessor(key):
+    """
+    Compile a dotted key into a function doc -> value with the path walk unrolled;
+    shared by find/groupby/aggregate/join so no hot loop re-walks the split path.
+    """
+    lines = ["def get(doc):",
+             "    if not isinstance(doc, dict):",
+             "        return None"]
+    lines += _walk_lines("v", key)
+    lines.append("    return v")
+    return _exec_function(lines, "get")
+
+@functools.lru_cache(maxsize=256)
+def _compile_projector(fields):
+    """
+    Compile a tuple of dotted fields into one function doc -> {field: value},
+    with every path walk unrolled (same results as _compile_accessor per field).
+    """
+    lines = ["def project(doc):",
+             "    if not isinstance(doc, dict):",
+             "        return {%s}" % ", ".join("%r: None" % f for f in fields)]
+    for i, field in enumerate(fields):
+        lines += _walk_lines("v%d" % i, field)
+    lines.append("    return {%s}" % ", ".join("%r: v%d" % (f, i) for i, f in enumerate(fields)))
+    return _exec_function(lines, "project")
+
 class Collection:
 
     def __init__(self, data):
         self.data = data if isinstance(data, list) else [data]#ensure that data is a list or turned to be a list
+        self._columns = {}#key -> (codes, uniques), built lazily by _factorize
+        self._numbers = {}#field -> (mask, values), built lazily by _numeric
+        self._lowered = {}#key -> lower-cased string uniques, built lazily by _lowered_strings
+        self._indexes = {}#key -> join hash map, built lazily by _build_index
+
+    @property
+    def records(self):
+        """documents the dotted keys are resolved on (the data itself here, see CollectionView)"""
+        return self.data
+
+    def count(self):
+        return len(self.records)
+
+    def head(self, n):
+        return self.data[:n]
     
     def _extract_key(self, doc, key):
         """supports dot notation"""
-        ks = key.split(".")
-        cur = doc
-        for k in ks:
-            if not isinstance(cur, dict) or k not in cur:
-                return None
-            cur = cur[k]
-        return cur
+        return _compile_accessor(key)(doc)
+
+    def _factorize(self, key):
+        """
+        Column view of one (dotted) key: an int code per document plus the list
+        of distinct values. Values are keyed by (type, value) so 1, 1.0 and True
+        stay separate. Returns None if the key holds unhashable values.
+        """
+        if key not in self._columns:
+            index = {}
+            uniques = []
+            codes = np.empty(self.count(), dtype=np.intp)
+            get = _compile_accessor(key)
+            try:
+                for i, doc in enumerate(self.records):
+                    v = get(doc)
+                    tv = (v.__class__, v)
+                    code = index.get(tv)
+                    if code is None:
+                        code = index[tv] = len(uniques)
+                        uniques.append(v)
+                    codes[i] = code
+            except TypeError:#list/dict values cannot be hashed
+                self._columns[key] = None
+            else:
+                self._columns[key] = (codes, uniques)
+        return self._columns[key]
+
+    def _numeric(self, field):
+        """
+        Numeric column for a top-level field, as used by the agg_* functions:
+        a mask of documents whose value is an int/float and those values.
+        """
+        if field not in self._numbers:
+            raw = [doc.get(field) for doc in self.data]
+            values = [v for v in raw if isinstance(v, (int, float))]
+            if len(values) == len(raw):#common case: every value is numeric
+                mask = np.ones(len(raw), dtype=bool)
+            else:
+                mask = np.array([isinstance(v, (int, float)) for v in raw], dtype=bool)
+            self._numbers[field] = (mask, np.array(values, dtype=object))
+        return self._numbers[field]
+
+    def _lowered_strings(self, key, uniques):
+        """
+        Split the distinct values of a factorized key for string queries:
+        (positions of the str values, those values lower-cased, positions of the rest).
+        """
+        if key not in self._lowered:
+            str_pos, lowered, other_pos = [], [], []
+            for i, u in enumerate(uniques):
+                if isinstance(u, str):
+                    str_pos.append(i)
+                    lowered.append(u.lower())
+                else:
+                    other_pos.append(i)
+            self._lowered[key] = (np.array(str_pos, dtype=np.intp), np.array(lowered, dtype=object),
+                                  np.array(other_pos, dtype=np.intp))
+        return self._lowered[key]
+
+    def _group_codes(self, group_key):
+        """
+        (keys, codes, counts) for grouping on group_key: the group keys in first
+        appearance order, a group code per document and the group sizes.
+        Returns None when the group key cannot be factorized.
+        """
+        column = self._factorize(group_key)
+        if column is None:
+            return None
+        codes, uniques = column
+        # merge distinct values that a dict treats as one key (1, 1.0, True)
+        groups = {}
+        remap = np.fromiter((groups.setdefault(u, len(groups)) for u in uniques), dtype=np.intp, count=len(uniques))
+        # string group keys are interned (as the engagement locations are), so results
+        # of repeated aggregations share one object per value instead of a parsed copy each
+        keys = [sys.intern(k) if k.__class__ is str else k for k in groups]
+        gcodes = remap[codes]
+        return keys, gcodes, np.bincount(gcodes, minlength=len(keys)).tolist()
+
+    def _reduce_groups(self, keys, gcodes, field, reduce):
+        # sort the numeric values of field by group once, then apply the
+        # Python builtin to each group's list slice (same result as the lambdas)
+        mask, values = self._numeric(field)
+        gnum = gcodes[mask]
+        order = np.argsort(gnum, kind="stable")#keeps document order within a group
+        vals = values[order].tolist()
+        ends = np.cumsum(np.bincount(gnum, minlength=len(keys))).tolist()
+        out = []
+        start = 0
+        for end in ends:
+            out.append(reduce(vals[start:end]))
+            start = end
+        return out
+
+    def _aggregate_columnar(self, group_key, kind, field):
+        """
+        aggregate() for the built-in agg_* functions on the factorized columns.
+        Returns None when the group key cannot be factorized.
+        """
+        grouping = self._group_codes(group_key)
+        if grouping is None:
+            return None
+        keys, gcodes, counts = grouping
+        if kind == "count":
+            return dict(zip(keys, counts))
+        reduce = {"sum": sum, "avg": sum, "max": max, "min": min}[kind]
+        values = self._reduce_groups(keys, gcodes, field, reduce)
+        if kind == "avg":
+            values = [v / n_docs for v, n_docs in zip(values, counts)]
+        return dict(zip(keys, values))
+
+    @staticmethod
+    def _value_matches(cur, value):
+        # Exact match first
+        if cur == value:
+            return True
+        # Case-insensitive match for strings
+        if isinstance(cur, str) and isinstance(value, str):
+            if cur.lower() == value.lower():
+                return True
+        # Type conversion for numbers
+        if isinstance(cur, (int, float)) and isinstance(value, str):
+            try:
+                if isinstance(cur, int) and int(value) == cur:
+                    return True
+                if isinstance(cur, float) and float(value) == cur:
+                    return True
+            except (ValueError, TypeError):
+                pass
+        if isinstance(value, (int, float)) and isinstance(cur, str):
+            try:
+                if isinstance(value, int) and int(cur) == value:
+                    return True
+                if isinstance(value, float) and float(cur) == value:
+                    return True
+            except (ValueError, TypeError):
+                pass
+        # Boolean/string matching
+        if isinstance(cur, bool) and isinstance(value, str):
+            bool_str = "true" if cur else "false"
+            if bool_str.lower() == value.lower():
+                return True
+        if isinstance(value, bool) and isinstance(cur, str):
+            bool_str = "true" if value else "false"
+            if bool_str.lower() == cur.lower():
+                return True
+        # None/null matching
+        if cur is None and isinstance(value, str) and value.lower() in ["none", "null", ""]:
+            return True
+        if value is None and (cur is None or (isinstance(cur, str) and cur.lower() in ["none", "null", ""])):
+            return True
+        # If none of the matches worked, this document doesn't match
+        return False
 
     def find(self, query=None):#query like{"attitude_count":500,"likes":2}
         
         if query is None:#find all data
             return self.data
 
-        def match(doc, query): #to check if doc fits query
-            for key, value in query.items():
-                cur = self._extract_key(doc, key)  
-                # Exact match first
-                if cur == value:
-                    continue
-                # Case-insensitive match for strings
-                if isinstance(cur, str) and isinstance(value, str):
-                    if cur.lower() == value.lower():
-                        continue
-                # Type conversion for numbers
-                if isinstance(cur, (int, float)) and isinstance(value, str):
-                    try:
-                        if isinstance(cur, int) and int(value) == cur:
-                            continue
-                        if isinstance(cur, float) and float(value) == cur:
-                            continue
-                    except (ValueError, TypeError):
-                        pass
-                if isinstance(value, (int, float)) and isinstance(cur, str):
-                    try:
-                        if isinstance(value, int) and int(cur) == value:
-                            continue
-                        if isinstance(value, float) and float(cur) == value:
-                            continue
-                    except (ValueError, TypeError):
-                        pass
-                # Boolean/string matching
-                if isinstance(cur, bool) and isinstance(value, str):
-                    bool_str = "true" if cur else "false"
-                    if bool_str.lower() == value.lower():
-                        continue
-                if isinstance(value, bool) and isinstance(cur, str):
-                    bool_str = "true" if value else "false"
-                    if bool_str.lower() == cur.lower():
-                        continue
-                # None/null matching
-                if cur is None and isinstance(value, str) and value.lower() in ["none", "null", ""]:
-                    continue
-                if value is None and (cur is None or (isinstance(cur, str) and cur.lower() in ["none", "null", ""])):
-                    continue
-                # If none of the matches worked, this document doesn't match
-                return False
+        # vectorized path: test each distinct value once, then AND boolean masks
+        mask = np.ones(self.count(), dtype=bool)
+        for key, value in query.items():
+            column = self._factorize(key)
+            if column is None:
+                break
+            codes, uniques = column
+            if isinstance(value, str):
+                # a str value matches a str field only by case-insensitive equality,
+                # so those uniques are compared in one array operation
+                str_pos, lowered, other_pos = self._lowered_strings(key, uniques)
+                hits = np.zeros(len(uniques), dtype=bool)
+                hits[str_pos] = lowered == value.lower()
+                hits[other_pos] = [self._value_matches(uniques[i], value) for i in other_pos.tolist()]
+            else:
+                hits = np.fromiter((self._value_matches(u, value) for u in uniques), dtype=bool, count=len(uniques))
+            mask &= hits[codes]
+        else:
+            return [self.data[i] for i in np.flatnonzero(mask)]
+
+        conditions = [(_compile_accessor(key), value) for key, value in query.items()]
+
+        def match(doc): #to check if doc fits query
+            for get, value in conditions:
+                cur = get(doc)
+                if not self._value_matches(cur, value):
+                    return False
             # All query conditions matched
             return True
 
-        return [doc for doc in self.data if match(doc, query)]
+        return [doc for rec, doc in zip(self.records, self.data) if match(rec)]
 
     def project(self, fields):
 
     #Return documents with only selected fields.
     #Example: fields = ["user", "text"]
 
-        result = []
-        for doc in self.data:
-            projected = {}
-            for field in fields:
-                #use _extract_key to process nested key
-                projected[field] = self._extract_key(doc, field)
-            result.append(projected)
-        return result
+        #compiled once per field list; handles nested keys like _extract_key
+        project = _compile_projector(tuple(fields))
+        return [project(doc) for doc in self.records]
 
     def groupby(self, key):
         groups = {}
-        for doc in self.data:
-            group_value = self._extract_key(doc, key) 
+        get = _compile_accessor(key)
+        for rec, doc in zip(self.records, self.data):
+            group_value = get(rec)
             groups.setdefault(group_value, []).append(doc)
         return groups
 
     def aggregate(self, group_key, agg_func):
         #Apply an aggregation function (sum, count, avg, etc.) on each group.
+        kind = getattr(agg_func, "kind", None)
+        if kind is not None:#built-in agg_* function: use the column fast path
+            result = self._aggregate_columnar(group_key, kind, agg_func.field)
+            if result is not None:
+                return result
         grouped = self.groupby(group_key)
         result = {}
         for k, docs in grouped.items():
             result[k] = agg_func(docs)
         return result
 
+    def aggregate_counter(self, group_key):
+        """Group sizes as a Counter, i.e. aggregate(group_key, agg_count()) ready for most_common."""
+        grouping = self._group_codes(group_key)
+        if grouping is None:
+            return Counter(self.aggregate(group_key, agg_count()))
+        keys, _, counts = grouping
+        return Counter(dict(zip(keys, counts)))
+
+    def _build_index(self, key):
+        """
+        Hash map {join value: [docs]} for key, built once per key and reused by
+        later joins (e.g. when only the join type changes).
+        """
+        if key not in self._indexes:
+            hashmap = defaultdict(list)
+            get = _compile_accessor(key)
+            for rec, doc in zip(self.records, self.data):
+                hashmap[get(rec)].append(doc)
+            self._indexes[key] = dict(hashmap)#plain dict: lookups must not insert
+        return self._indexes[key]
 
     def hash_join(self, other, key_self, key_other, join_type="inner"):
         """
         join_type: inner / left / right / full
         """
+        return list(self.iter_hash_join(other, key_self, key_other, join_type))
 
-        # Build hash map for other
-        hashmap = {}
-        for doc in other.data:
-            val = self._extract_key(doc, key_other)
-            hashmap.setdefault(val, []).append(doc)
-
-        result = []
-        # Process left side (self)
-        matched_right_keys = set()
-
-        for doc_left in self.data:
-            val_left = self._extract_key(doc_left, key_self)
-            if val_left in hashmap:
-                for doc_right in hashmap[val_left]:
-                    matched_right_keys.add(id(doc_right))
-                    result.append({
-                        "left": doc_left,
-                        "right": doc_right
-                    })
-            else:
-                if join_type in ("left", "full"):
-                    result.append({
-                        "left": doc_left,
-                        "right": None
-                    })
-
-        # Process unmatched right side (right join or full join)
-        if join_type in ("right", "full"):
-            for doc_right in other.data:
-                if id(doc_right) not in matched_right_keys:
-                    result.append({
-                        "left": None,
-                        "right": doc_right
-                    })
-
-        return result
+    def iter_hash_join(self, other, key_self, key_other, join_type="inner"):
+        """
+        Streaming hash_join: yields {"left": ..., "right": ...} rows one at a time,
+        so memory is bounded by the hash map rather than the join result.
+        The hash map is built on the smaller collection and probed with the other.
+        """
+        keep_left = join_type in ("left", "full")
+        keep_right = join_type in ("right", "full")
+
+        # Build hash map for the smaller side (reused across joins on the same key)
+        if other.count() <= self.count():
+            build, key_build, probe, key_probe = other, key_other, self, key_self
+            keep_build, keep_probe = keep_right, keep_left
+            pair = lambda doc_probe, doc_build: {"left": doc_probe, "right": doc_build}
+        else:
+            build, key_build, probe, key_probe = self, key_self, other, key_other
+            keep_build, keep_probe = keep_left, keep_right
+            pair = lambda doc_probe, doc_build: {"left": doc_build, "right": doc_probe}
+
+        hashmap = build._build_index(key_build)
+
+        # Process the probe side, remembering which join values found a match
+        matched_keys = set()
+        get_probe = _compile_accessor(key_probe)
+
+        for rec, doc_probe in zip(probe.records, probe.data):
+            val = get_probe(rec)
+            docs_build = hashmap.get(val)
+            if docs_build:
+                matched_keys.add(val)
+                for doc_build in docs_build:
+                    yield pair(doc_probe, doc_build)
+            elif keep_probe:
+                yield pair(doc_probe, None)
+
+        # Process unmatched groups of the build side (for the outer side of the join)
+        if keep_build:
+            for val, docs_build in hashmap.items():
+                if val not in matched_keys:
+                    for doc_build in docs_build:
+                        yield pair(None, doc_build)
     def pipeline(self, query=None, project_fields=None,
                  group_key=None, agg_func=None,
                  join_collection=None, join_self_key=None, 
@@ -341,96 +655,266 @@ class Collection:
 
         return data
 
+
+class CollectionView(Collection):
+    """
+    Collection over hash_join rows {"left": ..., "right": ...}. Its data are the
+    rows flattened to "left."/"right." keys, built only when first needed;
+    dotted keys ("right.name", "left.user._id") resolve on the nested rows.
+    """
+
+    @property
+    def data(self):
+        if self._flat is None:
+            self._flat = flatten_join_rows(self.rows)
+        return self._flat
+
+    @data.setter
+    def data(self, rows):
+        self.rows = rows
+        self._flat = None
+
+    @property
+    def records(self):
+        return self.rows
+
+    def head(self, n):
+        if self._flat is not None:
+            return self._flat[:n]
+        return flatten_join_rows(self.rows[:n])
+
 # ============================================================================
 # Aggregate Functions (from final_code.ipynb)
 # ============================================================================
 
+def _agg(kind, field, func):
+    # tag the function so Collection.aggregate can recognise it
+    func.kind, func.field = kind, field
+    return func
+
+def _field_numbers(docs, field):
+    # numeric values of field: one dict lookup and one type check per document
+    values = [doc.get(field) for doc in docs]
+    return [v for v in values if isinstance(v, (int, float))]
+
 def agg_count(field=None):
-    return lambda docs: len(docs)
+    return _agg("count", field, lambda docs: len(docs))
 
 def agg_sum(field):
-    return lambda docs: sum(
-        doc.get(field, 0) for doc in docs
-        if isinstance(doc.get(field), (int, float))
-    )
+    return _agg("sum", field, lambda docs: sum(_field_numbers(docs, field)))
 
 def agg_max(field):
-    return lambda docs: max(
-        doc.get(field) for doc in docs
-        if isinstance(doc.get(field), (int, float))
-    )
+    return _agg("max", field, lambda docs: max(_field_numbers(docs, field)))
 
 def agg_min(field):
-    return lambda docs: min(
-        doc.get(field) for doc in docs
-        if isinstance(doc.get(field), (int, float))
-    )
+    return _agg("min", field, lambda docs: min(_field_numbers(docs, field)))
 
 def agg_avg(field):
-    return lambda docs: (
-        sum(doc.get(field, 0) for doc in docs
-            if isinstance(doc.get(field), (int, float)))
-        / len(docs)
+    return _agg("avg", field, lambda docs: (
+        sum(_field_numbers(docs, field)) / len(docs)
         if docs else None
-    )
+    ))
 
 # ============================================================================
 # Load JSON/JSONL Files (from final_code.ipynb)
 # ============================================================================
-def load_json_chunks(path, chunk_size=5000):
+_BLANK_RE = re.compile(rb'\s*')
+
+def _iter_jsonl(buf, mv, parser):
+    """parse one record per line, handing the parser zero-copy slices of the buffer"""
+    start, size = 0, len(buf)
+    while start < size:
+        end = buf.find(b"\n", start)
+        if end < 0:
+            end = size
+        if _BLANK_RE.match(buf, start, end).end() < end:#skip blank lines
+            yield parser.parse(mv[start:end])
+        start = end + 1
+
+def iter_json_chunks(buf, chunk_size=5000):
     """
-    Generic loader:
-        - if JSONL:  one JSON object per line
-        - if JSON array: [ {...}, {...} ]
+    Same as load_json_chunks, but over an in-memory buffer (bytes or mmap).
     """
-    with open(path, "r", encoding="utf-8") as f:
-        first_char = f.read(1)#to identify whether it is a josn or a jsonl
-        f.seek(0)#go back to the begining 
-
-        if first_char == "[":  # JSON array
-            text = f.read()
-            parser = Parser()
-            arr = parser.parse(text)
+    if not buf:
+        return
+    with memoryview(buf) as mv:
+        # one scan of the whole buffer; records are only checked one by one if it hits
+        parser = Parser(check_ints=not USE_PUREPY_PARSER and _has_long_digit_run(mv))
+        if buf[0] == ord("["):  # JSON array
+            arr = parser.parse(mv)
+            if not arr:
+                return
+            if chunk_size is None or len(arr) <= chunk_size:
+                yield arr#no slice copy when one chunk holds everything
+                return
             for i in range(0, len(arr), chunk_size):
                 yield arr[i:i + chunk_size]
         else: # JSONL
-            parser = Parser()
-            buffer = []
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                buffer.append(parser.parse(line))
-                if len(buffer) >= chunk_size:
+            records = _iter_jsonl(buf, mv, parser)
+            if chunk_size is None:
+                yield list(records)
+                return
+            buffer = [None] * chunk_size#preallocated, filled by index
+            n = 0
+            for doc in records:
+                buffer[n] = doc
+                n += 1
+                if n == chunk_size:
                     yield buffer
-                    buffer = []
-            if buffer:
-                yield buffer
+                    buffer = [None] * chunk_size
+                    n = 0
+            if n:
+                yield buffer[:n]
+
+def load_json_chunks(path, chunk_size=5000):
+    """
+    Generic loader:
+        - if JSONL:  one JSON object per line
+        - if JSON array: [ {...}, {...} ]
+    chunk_size=None yields all records as a single chunk.
+    """
+    # mmap the file: orjson parses the mapped bytes directly, no read copy or utf-8 decode
+    with open(path, "rb") as f:
+        if not f.read(1):#empty file (mmap cannot map it)
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from iter_json_chunks(mm, chunk_size)
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+def iter_raw_chunks(source, chunk_size=5000):
+    """
+    Like load_json_chunks, but JSONL chunks are yielded as raw bytes
+    (chunk_size lines joined) so they can be parsed in a worker process.
+    A JSON array has to be parsed as a whole, so its chunks are yielded parsed.
+    source is a file path or the document's bytes (e.g. an upload).
+    """
+    with (open(source, "rb") if _is_path(source) else io.BytesIO(source)) as f:
+        first_char = f.read(1)
+        f.seek(0)
+        if first_char == b"[":
+            yield from (load_json_chunks(source, chunk_size) if _is_path(source)
+                        else iter_json_chunks(source, chunk_size))
+            return
+        lines = []
+        for line in f:
+            if not line.strip():
+                continue
+            lines.append(line)
+            if len(lines) >= chunk_size:
+                yield b"".join(lines)
+                lines = []
+        if lines:
+            yield b"".join(lines)
+
+def prefetch(iterable, n=2):
+    """
+    Iterate iterable in a background thread, keeping up to n items queued, so
+    producing the next chunk overlaps with processing the current one.
+    Exceptions from the producer are re-raised in the consumer.
+    """
+    q = queue.Queue(maxsize=n)
+    stop = threading.Event()
+    done = object()
+
+    def put(entry):
+        while not stop.is_set():#give up once the consumer has gone away
+            try:
+                q.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((True, item)):
+                    return
+            put((True, done))
+        except Exception as e:
+            put((False, e))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            ok, item = q.get()
+            if not ok:
+                raise item
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
 
 def load_json_file(file_path):
     """Load entire JSON/JSONL file into memory."""
-    all_data = []
-    for chunk in load_json_chunks(file_path, chunk_size=10000):
-        all_data.extend(chunk)
-    return all_data
+    return next(load_json_chunks(file_path, chunk_size=None), [])
 
-def get_all_fields(data, prefix=""):
-    """Extract all field paths from JSON data structure."""
+def load_json_bytes(data):
+    """
+    Parse a whole JSON/JSONL document that is already in memory (e.g. an upload).
+    For a Streamlit upload pass getvalue(): it hands over the uploaded bytes
+    without a copy, while getbuffer() has to copy them first.
+    """
+    return next(iter_json_chunks(data, chunk_size=None), [])
+
+def to_json_bytes(data):
+    """UTF-8 JSON with 2-space indentation (for downloads), via orjson when installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        except TypeError:#e.g. integers beyond 64 bits
+            pass
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+def _collect_fields(doc, prefix, fields):
+    # add the field paths of one dict (lists are sampled by their first item)
+    for k, v in doc.items():
+        full_key = f"{prefix}.{k}" if prefix else k
+        fields.add(full_key)
+        if isinstance(v, list) and v and isinstance(v[0], dict):
+            _collect_fields(v[0], full_key, fields)
+        elif isinstance(v, dict):
+            _collect_fields(v, full_key, fields)
+
+def downcast_ints(df):
+    """Copy of df with int64 columns narrowed to the smallest integer dtype (lossless)."""
+    df = df.copy()
+    for col in df.select_dtypes("int64").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+def get_all_fields(data, prefix="", sample=1):
+    """
+    Extract all field paths from JSON data structure.
+    For a list, the fields of the first `sample` items are merged (0 = all items).
+    """
     fields = set()
-    if isinstance(data, list) and data:
-        data = data[0]  # Use first item as sample
-    
-    if isinstance(data, dict):
-        for k, v in data.items():
-            full_key = f"{prefix}.{k}" if prefix else k
-            fields.add(full_key)
-            if isinstance(v, (dict, list)):
-                if isinstance(v, list) and v and isinstance(v[0], dict):
-                    fields.update(get_all_fields(v[0], full_key))
-                elif isinstance(v, dict):
-                    fields.update(get_all_fields(v, full_key))
+    if isinstance(data, list):
+        items = data[:sample] if sample else data
+    else:
+        items = [data]
+    for item in items:
+        if isinstance(item, dict):
+            _collect_fields(item, prefix, fields)
     return sorted(fields)
 
+def flatten_join_rows(rows):
+    """
+    Flatten hash_join rows {"left": {...}, "right": {...}} into one dict each,
+    with "left."/"right." prefixed keys (a missing side adds no keys).
+    """
+    flattened = []
+    for r in rows:
+        left, right = r.get("left"), r.get("right")
+        flat = {"left." + k: v for k, v in left.items()} if left else {}
+        if right:
+            flat.update({"right." + k: v for k, v in right.items()})
+        flattened.append(flat)
+    return flattened
+
 # ============================================================================
 # Partial Aggregation (for chunk processing)
 # ============================================================================
@@ -460,72 +944,125 @@ class PartialAgg:
         total = count1 + count2
         return (avg1 * count1 + avg2 * count2) / total, total
 
-def calculate_average_engagement_by_location(filepath, chunk_size=5000):
+ENGAGEMENT_FIELDS = ["reposts_count", "comments_count", "attitudes_count"]
+
+def _engagement_columns(chunk):
+    """
+    Structure-of-arrays view of one chunk: the distinct locations, a chunk-local
+    location id per post and an (n_posts, 3) array of the engagement fields
+    (non-numeric or missing values count as 0, as in agg_sum).
+    """
+    index = {}
+    loc_ids = np.fromiter((index.setdefault(doc.get("ip_location"), len(index)) for doc in chunk),
+                          dtype=np.intp, count=len(chunk))
+    values = np.empty((len(chunk), len(ENGAGEMENT_FIELDS)), dtype=np.float64)
+    for j, field in enumerate(ENGAGEMENT_FIELDS):
+        values[:, j] = [v if isinstance(v, (int, float)) else 0 for v in (doc.get(field) for doc in chunk)]
+    return list(index), loc_ids, values
+
+def _reduce_aer(loc_ids, values, n_locs):
+    """
+    Reduction kernel: post count and per-field sums for every location,
+    one compiled bincount pass per column instead of a Python loop per post.
+    """
+    counts = np.bincount(loc_ids, minlength=n_locs)
+    sums = np.empty((n_locs, values.shape[1]), dtype=np.float64)
+    for j in range(values.shape[1]):
+        sums[:, j] = np.bincount(loc_ids, weights=values[:, j], minlength=n_locs)
+    return counts, sums
+
+def _aggregate_chunk(chunk):
+    """
+    Partial aggregation of one chunk: (locations, counts, sums) where row i of
+    counts/sums belongs to locations[i] (sums columns follow ENGAGEMENT_FIELDS).
+    Raw JSONL bytes (from iter_raw_chunks) are parsed here, i.e. in the worker.
+    """
+    if isinstance(chunk, bytes):
+        parser = Parser(check_ints=not USE_PUREPY_PARSER and _has_long_digit_run(chunk))
+        chunk = [parser.parse(line) for line in chunk.splitlines() if line.strip()]
+    locations, loc_ids, values = _engagement_columns(chunk)
+    return (locations, *_reduce_aer(loc_ids, values, len(locations)))
+
+def iter_record_chunks(records, chunk_size=5000):
+    """Batch an iterable of records into lists of at most chunk_size."""
+    it = iter(records)
+    while chunk := list(islice(it, chunk_size)):
+        yield chunk
+
+def calculate_average_engagement_by_location(source, chunk_size=5000, workers=1):
     """
     Calculates the Average Engagement Rate (AER) grouped by IP location 
     for large datasets using chunked processing and partial aggregation merging.
     This demonstrates the project's scaling requirement.
     AER = (Total Reposts + Total Comments + Total Attitudes) / Total Posts
+    source is a JSON/JSONL file path, the bytes of such a document, or an
+    iterable of already-loaded records.
+    With workers > 1 the chunks of a path/bytes source are parsed and aggregated
+    in a process pool (map step) and merged here (reduce step); needs the "fork"
+    start method. Loaded records are always aggregated here: there is no parsing
+    left to parallelize, and pickling whole documents to workers costs more
+    than the aggregation itself.
+    The Streamlit app always calls this with workers=1: forking its threaded
+    server can deadlock a worker, and worker tasks pickle _aggregate_chunk by
+    reference to __main__, which Streamlit replaces on every rerun.
     """
     
-    # 1. initialize four global partial result containers
-    # Dictionaries to store merged partial aggregation results globally
-    partial_counts = {}
-    partial_reposts_sums = {}
-    partial_comments_sums = {}
-    partial_attitudes_sums = {}
+    # 1. initialize the global partial result containers: each location is
+    # interned to an int code that indexes the count and sum arrays
+    loc_ids = {}
+
+    def loc_code(loc):
+        # first sight of a location stores an interned copy, so the table (and
+        # the result) hold one shared key object per location across all chunks
+        code = loc_ids.get(loc)
+        if code is None:
+            code = loc_ids[sys.intern(loc) if isinstance(loc, str) else loc] = len(loc_ids)
+        return code
+
+    partial_counts = np.zeros(64, dtype=np.int64)
+    partial_sums = np.zeros((64, len(ENGAGEMENT_FIELDS)), dtype=np.float64)#reposts, comments, attitudes
     
     # 2. process the file chunk by chunk
-    for chunk in load_json_chunks(filepath, chunk_size):
-        coll = Collection(chunk)
-    
-        # local aggregation calculations (Grouped by "ip_location")
-        chunk_counts = coll.aggregate("ip_location", agg_count())
-        chunk_reposts = coll.aggregate("ip_location", agg_sum("reposts_count"))
-        chunk_comments = coll.aggregate("ip_location", agg_sum("comments_count"))
-        chunk_attitudes = coll.aggregate("ip_location", agg_sum("attitudes_count"))
-        
-        # 3. merge Local Results
-        
-        # Merge Counts (Total Posts)
-        for loc, count in chunk_counts.items():
-            current_count = partial_counts.get(loc, 0)
-            # use PartialAgg.merge_count to combine current global total with local chunk total
-            partial_counts[loc] = PartialAgg.merge_count(current_count, count)
-            
-        # Merge Reposts Sums
-        for loc, total in chunk_reposts.items():
-            current_total = partial_reposts_sums.get(loc, 0)
-            # Use PartialAgg.merge_sum for addition
-            partial_reposts_sums[loc] = PartialAgg.merge_sum(current_total, total)
-            
-        # Merge Comments Sums
-        for loc, total in chunk_comments.items():
-            current_total = partial_comments_sums.get(loc, 0)
-            partial_comments_sums[loc] = PartialAgg.merge_sum(current_total, total)
-            
-        # Merge Attitudes (Likes) Sums
-        for loc, total in chunk_attitudes.items():
-            current_total = partial_attitudes_sums.get(loc, 0)
-            partial_attitudes_sums[loc] = PartialAgg.merge_sum(current_total, total)
+    from_document = _is_path(source) or isinstance(source, (bytes, bytearray))
+    pool = None
+    if from_document and workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        pool = multiprocessing.get_context("fork").Pool(workers)
+    try:
+        if not from_document:
+            all_partials = map(_aggregate_chunk, iter_record_chunks(source, chunk_size))
+        elif pool is not None:
+            all_partials = pool.imap_unordered(_aggregate_chunk, iter_raw_chunks(source, chunk_size))
+        elif _is_path(source):
+            all_partials = map(_aggregate_chunk, prefetch(load_json_chunks(source, chunk_size)))
+        else:
+            all_partials = map(_aggregate_chunk, prefetch(iter_json_chunks(source, chunk_size)))
+        for locations, counts, sums in all_partials:
+            # 3. merge Local Results
+            codes = np.fromiter(map(loc_code, locations), dtype=np.intp, count=len(locations))
+            if len(loc_ids) > len(partial_counts):
+                extra = max(len(loc_ids), 2 * len(partial_counts)) - len(partial_counts)
+                partial_counts = np.pad(partial_counts, (0, extra))
+                partial_sums = np.pad(partial_sums, ((0, extra), (0, 0)))
+            # codes are unique within a chunk, so fancy-index addition merges every location at once
+            partial_counts[codes] = PartialAgg.merge_count(partial_counts[codes], counts)
+            partial_sums[codes] = PartialAgg.merge_sum(partial_sums[codes], sums)
+    finally:
+        if pool is not None:
+            pool.terminate()
             
     # 4. Calculate Final Average Engagement Rate (Final Calculation)
+    n_locs = len(loc_ids)
+    total_posts = partial_counts[:n_locs]
+    total_interactions = partial_sums[:n_locs].sum(axis=1)
+    # Calculate Average Engagement Rate, prevent division by zero
+    avg_engagement_rates = np.divide(total_interactions, total_posts,
+                                     out=np.zeros(n_locs), where=total_posts > 0)
+    
     final_results = {}
-    for loc in partial_counts:
-        # Get all global sums
-        total_interactions = (
-            partial_reposts_sums.get(loc, 0) +
-            partial_comments_sums.get(loc, 0) +
-            partial_attitudes_sums.get(loc, 0)
-        )
-        total_posts = partial_counts[loc]
-        
-        # Calculate Average Engagement Rate, prevent division by zero
-        avg_engagement_rate = total_interactions / total_posts if total_posts else 0
-        
+    for loc, posts, rate in zip(loc_ids, total_posts.tolist(), avg_engagement_rates.tolist()):
         final_results[loc] = {
-            "Total_Posts": total_posts,
-            "Avg_Engagement_Rate": avg_engagement_rate
+            "Total_Posts": posts,
+            "Avg_Engagement_Rate": rate
         }
     
     return final_results
@@ -553,12 +1090,13 @@ uploaded_file = st.sidebar.file_uploader(
 )
 
 # Also allow selecting from existing files
-existing_files = []
-import os
-if os.path.exists("chatgpt 20240514-0914.jsonl"):
-    existing_files.append("chatgpt 20240514-0914.jsonl")
-if os.path.exists("chatgpt 20240915-1231.jsonl"):
-    existing_files.append("chatgpt 20240915-1231.jsonl")
+@st.cache_data(ttl=60, show_spinner=False)
+def find_existing_files():
+    """Bundled dataset files present in the working directory (probed at most once a minute)."""
+    candidates = ("chatgpt 20240514-0914.jsonl", "chatgpt 20240915-1231.jsonl")
+    return [f for f in candidates if os.path.exists(f)]
+
+existing_files = find_existing_files()
 
 if existing_files:
     selected_file = st.sidebar.selectbox(
@@ -568,6 +1106,16 @@ if existing_files:
 else:
     selected_file = None
 
+schema_sample = st.sidebar.number_input(
+    "Schema sample size",
+    min_value=0,
+    max_value=100_000,
+    value=200,
+    step=100,
+    help="Records scanned to list available fields (0 = all records)",
+    key="schema_sample"
+)
+
 # Initialize session state
 if 'collection' not in st.session_state:
     st.session_state.collection = None
@@ -581,60 +1129,101 @@ if 'use_join_results' not in st.session_state:
     st.session_state.use_join_results = False
 if 'current_file_name' not in st.session_state:
     st.session_state.current_file_name = None
+if 'available_fields_cache' not in st.session_state:
+    st.session_state.available_fields_cache = {"key": None, "fields": []}
+if 'fields_b_cache' not in st.session_state:
+    st.session_state.fields_b_cache = {"key": None, "fields": []}
+if 'flattened_join_collection' not in st.session_state:
+    st.session_state.flattened_join_collection = None
+if 'loaded_source' not in st.session_state:
+    st.session_state.loaded_source = None
+if 'loaded_source_b' not in st.session_state:
+    st.session_state.loaded_source_b = None
+if 'widget_nonce' not in st.session_state:
+    st.session_state.widget_nonce = (None, "default")
+if 'upload_identities' not in st.session_state:
+    st.session_state.upload_identities = {}
+
+def upload_identity(uploaded, slot):
+    """
+    Content identity of an upload: (name, size, blake2b digest of the bytes).
+    Streamlit gives every upload a new file_id, so the same file uploaded again
+    keeps its identity (no re-parse, no widget reset); the digest is computed
+    once per file_id of the uploader in slot.
+    """
+    file_id = getattr(uploaded, "file_id", None)
+    cached = st.session_state.upload_identities.get(slot)
+    if file_id is not None and cached is not None and cached[0] == file_id:
+        return cached[1]
+    data = uploaded.getvalue()
+    identity = (uploaded.name, len(data), hashlib.blake2b(data, digest_size=16).hexdigest())
+    st.session_state.upload_identities[slot] = (file_id, identity)
+    return identity
 
 # Load data
 if uploaded_file is not None:
     # Check if this is a new file
     new_file_name = uploaded_file.name
     file_changed = st.session_state.current_file_name != new_file_name
+    # the same upload is parsed once, not again on every rerun
+    source_id = ("upload", *upload_identity(uploaded_file, "main"))
     
-    with st.spinner("Loading data..."):
-        try:
-            # Save uploaded file temporarily
-            temp_path = f"temp_{uploaded_file.name}"
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            data = load_json_file(temp_path)
-            st.session_state.collection = Collection(data)
-            st.session_state.data_loaded = True
-            st.session_state.current_file_name = new_file_name
-            
-            # Clear join results when new file is loaded
-            if file_changed:
-                st.session_state.join_results = None
-                st.session_state.use_join_results = False
-                st.session_state.collection_b = None
-            
-            st.sidebar.success(f"Loaded {len(data)} records")
-            
-            # Clean up temp file
-            os.remove(temp_path)
-        except Exception as e:
-            st.sidebar.error(f"Load failed: {str(e)}")
-            st.session_state.data_loaded = False
+    if source_id != st.session_state.loaded_source or not st.session_state.data_loaded:
+        with st.spinner("Loading data..."):
+            try:
+                # parse the uploaded buffer in memory (no temp file round-trip)
+                data = load_json_bytes(uploaded_file.getvalue())
+                st.session_state.collection = Collection(data)
+                st.session_state.data_loaded = True
+                st.session_state.current_file_name = new_file_name
+                st.session_state.loaded_source = source_id
+                
+                # Clear join results (and cached views of the data) when new file is loaded
+                if file_changed:
+                    st.session_state.join_results = None
+                    st.session_state.use_join_results = False
+                    st.session_state.collection_b = None
+                    st.session_state.flattened_join_collection = None
+                    st.session_state.available_fields_cache = {"key": None, "fields": []}
+            except Exception as e:
+                st.sidebar.error(f"Load failed: {str(e)}")
+                st.session_state.data_loaded = False
+                st.session_state.loaded_source = None
+    
+    if st.session_state.data_loaded:
+        st.sidebar.success(f"Loaded {len(st.session_state.collection.data)} records")
 
 elif selected_file is not None:
     # Check if this is a new file
     file_changed = st.session_state.current_file_name != selected_file
+    try:
+        source_id = ("file", selected_file, os.path.getmtime(selected_file))
+    except OSError:#gone since the (cached) listing; the load below reports it
+        source_id = None
     
-    with st.spinner("Loading data..."):
-        try:
-            data = load_json_file(selected_file)
-            st.session_state.collection = Collection(data)
-            st.session_state.data_loaded = True
-            st.session_state.current_file_name = selected_file
-            
-            # Clear join results when new file is loaded
-            if file_changed:
-                st.session_state.join_results = None
-                st.session_state.use_join_results = False
-                st.session_state.collection_b = None
-            
-            st.sidebar.success(f"Loaded {len(data)} records")
-        except Exception as e:
-            st.sidebar.error(f"Load failed: {str(e)}")
-            st.session_state.data_loaded = False
+    if source_id != st.session_state.loaded_source or not st.session_state.data_loaded:
+        with st.spinner("Loading data..."):
+            try:
+                data = load_json_file(selected_file)
+                st.session_state.collection = Collection(data)
+                st.session_state.data_loaded = True
+                st.session_state.current_file_name = selected_file
+                st.session_state.loaded_source = source_id
+                
+                # Clear join results (and cached views of the data) when new file is loaded
+                if file_changed:
+                    st.session_state.join_results = None
+                    st.session_state.use_join_results = False
+                    st.session_state.collection_b = None
+                    st.session_state.flattened_join_collection = None
+                    st.session_state.available_fields_cache = {"key": None, "fields": []}
+            except Exception as e:
+                st.sidebar.error(f"Load failed: {str(e)}")
+                st.session_state.data_loaded = False
+                st.session_state.loaded_source = None
+    
+    if st.session_state.data_loaded:
+        st.sidebar.success(f"Loaded {len(st.session_state.collection.data)} records")
 
 # Main content area
 if not st.session_state.data_loaded or st.session_state.collection is None:
@@ -653,31 +1242,37 @@ else:
     if st.session_state.use_join_results and st.session_state.join_results:
         # Use join results as the working collection
         # Join results have structure: [{"left": {...}, "right": {...}}, ...]
-        # We need to flatten this for easier field access
-        flattened_join_results = []
-        for r in st.session_state.join_results:
-            flat = {}
-            if r.get("left"):
-                for k, v in r["left"].items():
-                    flat[f"left.{k}"] = v
-            if r.get("right"):
-                for k, v in r["right"].items():
-                    flat[f"right.{k}"] = v
-            flattened_join_results.append(flat)
-        working_collection = Collection(flattened_join_results)
+        # The view presents them flattened ("left.x", "right.y") but only builds the
+        # flat rows when a tab needs them; it is cached so reruns (widget clicks) reuse it
+        join_signature = id(st.session_state.join_results)
+        cached_join = st.session_state.flattened_join_collection
+        if cached_join is None or cached_join[0] != join_signature:
+            st.session_state.flattened_join_collection = (join_signature, CollectionView(st.session_state.join_results))
+        working_collection = st.session_state.flattened_join_collection[1]
+        fields_key = ("join", join_signature, schema_sample)
     else:
         working_collection = st.session_state.collection
+        # loaded_source changes whenever the content may have (upload digest, file mtime), even under the same name
+        fields_key = ("file", st.session_state.loaded_source, working_collection.count(), schema_sample)
     
     collection = working_collection
     
-    # Get available fields from data - always recalculate from current collection
-    if collection and collection.data:
-        available_fields = get_all_fields(collection.data)
-    else:
-        available_fields = []
+    # Get available fields from data - recalculated only when the data changes
+    if st.session_state.available_fields_cache["key"] != fields_key:
+        st.session_state.available_fields_cache = {
+            "key": fields_key,
+            "fields": get_all_fields(collection.head(schema_sample) if schema_sample else collection.data, sample=0) if collection and collection.count() else []
+        }
+    available_fields = st.session_state.available_fields_cache["fields"]
     
-    # Create a unique key suffix based on current file to force widget reset
-    file_key_suffix = st.session_state.current_file_name or "default"
+    # Widget key suffix from the identity of the working data: the same data keeps
+    # widget state across reruns and re-selection, different data resets the widgets
+    data_identity = (st.session_state.loaded_source, working_collection.count(),
+                     fields_key[1] if fields_key[0] == "join" else None)
+    if st.session_state.widget_nonce[0] != data_identity:
+        nonce = hashlib.blake2b(repr(data_identity).encode("utf-8"), digest_size=8).hexdigest()
+        st.session_state.widget_nonce = (data_identity, nonce)
+    file_key_suffix = st.session_state.widget_nonce[1]
     
     # Tab 1: Find
     with tab1:
@@ -734,7 +1329,7 @@ else:
                         
                         st.download_button(
                             label="Download JSON",
-                            data=json.dumps(results, ensure_ascii=False, indent=2),
+                            data=to_json_bytes(results),
                             file_name="query_results.json",
                             mime="application/json"
                         )
@@ -773,6 +1368,8 @@ else:
                 key=f"project_fields_text_{file_key_suffix}"
             )
         
+        show_all_rows = st.checkbox("Show full result", value=False, help="Otherwise the table shows the first 1000 rows (the CSV download always has all of them)", key=f"project_show_all_{file_key_suffix}")
+        
         if st.button("Execute", type="primary", key="project_execute"):
             try:
                 if available_fields and selected_fields:
@@ -789,7 +1386,8 @@ else:
                     
                     if results:
                         df = pd.DataFrame(results)
-                        st.dataframe(df, use_container_width=True)
+                        # the browser gets the first rows only, with narrowed integer columns
+                        st.dataframe(downcast_ints(df if show_all_rows else df.head(1000)), use_container_width=True)
                         
                         st.download_button(
                             label="Download CSV",
@@ -830,6 +1428,8 @@ else:
             else:
                 agg_field = None
                 st.caption("Count does not require a field")
+            
+            max_rows = st.number_input("Max rows shown", min_value=1, value=200, step=50, help="Largest groups shown in the table (the CSV download has all groups)", key=f"agg_max_rows_{file_key_suffix}")
         
         if st.button("Execute", type="primary", key="aggregate_execute"):
             try:
@@ -838,33 +1438,47 @@ else:
                 elif agg_type != "count" and not agg_field:
                     st.warning("Please select an aggregation field")
                 else:
+                    top = None
                     if agg_type == "count":
-                        agg_func = agg_count()
-                    elif agg_type == "sum":
-                        agg_func = agg_sum(agg_field)
-                    elif agg_type == "avg":
-                        agg_func = agg_avg(agg_field)
-                    elif agg_type == "max":
-                        agg_func = agg_max(agg_field)
-                    elif agg_type == "min":
-                        agg_func = agg_min(agg_field)
-                    
-                    results = collection.aggregate(group_key, agg_func)
+                        # group sizes as a Counter, which selects the largest groups itself
+                        results = collection.aggregate_counter(group_key)
+                        top = results.most_common(max_rows)
+                    else:
+                        if agg_type == "sum":
+                            agg_func = agg_sum(agg_field)
+                        elif agg_type == "avg":
+                            agg_func = agg_avg(agg_field)
+                        elif agg_type == "max":
+                            agg_func = agg_max(agg_field)
+                        elif agg_type == "min":
+                            agg_func = agg_min(agg_field)
+                        
+                        results = collection.aggregate(group_key, agg_func)
                 
                     st.caption(f"{len(results)} groups")
                     
-                    df = pd.DataFrame([
-                        {"Group": k, "Value": v}
-                        for k, v in results.items()
-                    ])
-                    df = df.sort_values("Value", ascending=False)
+                    full_df = pd.DataFrame(list(results.items()), columns=["Group", "Value"])
+                    # only the top rows are shown, so select them instead of sorting every group
+                    if top is not None:
+                        df = pd.DataFrame(top, columns=["Group", "Value"])
+                    elif pd.api.types.is_numeric_dtype(full_df["Value"]):
+                        df = full_df.nlargest(max_rows, "Value")
+                    else:
+                        df = full_df.sort_values("Value", ascending=False).head(max_rows)
+                    
+                    st.dataframe(downcast_ints(df), use_container_width=True)
                     
-                    st.dataframe(df, use_container_width=True)
+                    st.download_button(
+                        label="Download Results (CSV)",
+                        data=full_df.to_csv(index=False).encode('utf-8'),
+                        file_name="aggregate_results.csv",
+                        mime="text/csv"
+                    )
                     
                     chart_type = st.selectbox("Chart", ["Bar", "Pie"], key="agg_chart")
                     
                     if chart_type == "Bar":
-                        st.bar_chart(df.set_index("Group"))
+                        st.bar_chart(df.head(30).set_index("Group"))
                     else:
                         pie_df = df.head(10)
                         fig = px.pie(pie_df, values='Value', names='Group')
@@ -884,22 +1498,27 @@ else:
         )
         
         if uploaded_file_b is not None:
-            with st.spinner("Loading..."):
-                try:
-                    temp_path = f"temp_join_{uploaded_file_b.name}"
-                    with open(temp_path, "wb") as f:
-                        f.write(uploaded_file_b.getbuffer())
-                    
-                    data_b = load_json_file(temp_path)
-                    st.session_state.collection_b = Collection(data_b)
-                    st.caption(f"Loaded {len(data_b)} records")
-                    os.remove(temp_path)
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+            source_b = upload_identity(uploaded_file_b, "join")
+            if source_b != st.session_state.loaded_source_b or st.session_state.collection_b is None:
+                with st.spinner("Loading..."):
+                    try:
+                        data_b = load_json_bytes(uploaded_file_b.getvalue())
+                        st.session_state.collection_b = Collection(data_b)
+                        st.session_state.loaded_source_b = source_b
+                    except Exception as e:
+                        st.error(f"Error: {str(e)}")
+            if source_b == st.session_state.loaded_source_b and st.session_state.collection_b is not None:
+                st.caption(f"Loaded {len(st.session_state.collection_b.data)} records")
         
         if st.session_state.collection_b is not None:
-            # Get fields from both collections
-            fields_b = get_all_fields(st.session_state.collection_b.data) if st.session_state.collection_b.data else []
+            # Get fields from both collections; the second one's are inferred once per dataset
+            fields_b_key = (st.session_state.loaded_source_b, schema_sample)
+            if st.session_state.fields_b_cache["key"] != fields_b_key:
+                st.session_state.fields_b_cache = {
+                    "key": fields_b_key,
+                    "fields": get_all_fields(st.session_state.collection_b.data, sample=schema_sample) if st.session_state.collection_b.data else []
+                }
+            fields_b = st.session_state.fields_b_cache["fields"]
             all_join_fields = sorted(set(available_fields + fields_b))
             
             col1, col2 = st.columns(2)
@@ -914,67 +1533,74 @@ else:
             
             with col2:
                 join_type = st.selectbox("Type", ["inner", "left", "right", "full"], key=f"join_type_{file_key_suffix}")
+                materialize_all = st.checkbox("Materialize all results", value=True, help="Off: only compute the first rows as a quick preview", key=f"join_materialize_{file_key_suffix}")
             
             if st.button("Execute", type="primary", key="join_execute"):
                 try:
                     if not key_self or not key_other:
                         st.warning("Please select both join keys")
                     else:
-                        results = collection.hash_join(
+                        rows = collection.iter_hash_join(
                             st.session_state.collection_b,
                             key_self,
                             key_other,
                             join_type
                         )
+                        # the first rows are shown while the rest of the join is still running
+                        preview = list(islice(rows, 5))
+                        status = st.container()
                         
-                        # Save results to session state for use in other tabs
-                        st.session_state.join_results = results
-                        st.session_state.use_join_results = True
-                    
-                        st.success(f"Join completed: {len(results)} records")
-                        st.caption("Results saved. You can now use them in other tabs (Find, Project, Aggregate)")
-                        
-                        num_preview = st.slider("Preview", 1, min(5, len(results)), 3, key="join_preview")
+                        if len(preview) > 1:
+                            num_preview = st.slider("Preview", 1, len(preview), min(3, len(preview)), key="join_preview")
+                        else:
+                            num_preview = len(preview)
                         
-                        for i, result in enumerate(results[:num_preview]):
+                        for i, result in enumerate(preview[:num_preview]):
                             with st.expander(f"Record {i+1}"):
                                 st.json(result)
                         
-                        # Export options
-                        st.subheader("Export Results")
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.download_button(
-                                label="Download JSON",
-                                data=json.dumps(results, ensure_ascii=False, indent=2),
-                                file_name="join_results.json",
-                                mime="application/json",
-                                key="join_download_json"
-                            )
-                        
-                        with col2:
-                            # Convert to flattened format for CSV
-                            flattened_results = []
-                            for r in results:
-                                flat = {}
-                                if r.get("left"):
-                                    for k, v in r["left"].items():
-                                        flat[f"left.{k}"] = v
-                                if r.get("right"):
-                                    for k, v in r["right"].items():
-                                        flat[f"right.{k}"] = v
-                                flattened_results.append(flat)
+                        if not materialize_all:
+                            status.success(f"Join preview: first {len(preview)} records")
+                            status.caption("Enable 'Materialize all results' to run the full join for export and the other tabs")
+                        else:
+                            with st.spinner("Joining..."):
+                                results = preview + list(rows)
                             
-                            if flattened_results:
-                                df_join = pd.DataFrame(flattened_results)
+                            # Save results to session state for use in other tabs
+                            st.session_state.join_results = results
+                            st.session_state.use_join_results = True
+                            # the view flattens lazily; the CSV below flattens its own copy so
+                            # tabs that only need a sample or the count never flatten every row
+                            st.session_state.flattened_join_collection = (id(results), CollectionView(results))
+                            st.session_state.available_fields_cache = {"key": None, "fields": []}
+                            
+                            status.success(f"Join completed: {len(results)} records")
+                            status.caption("Results saved. You can now use them in other tabs (Find, Project, Aggregate)")
+                            
+                            # Export options
+                            st.subheader("Export Results")
+                            col1, col2 = st.columns(2)
+                            
+                            with col1:
                                 st.download_button(
-                                    label="Download CSV",
-                                    data=df_join.to_csv(index=False).encode('utf-8'),
-                                    file_name="join_results.csv",
-                                    mime="text/csv",
-                                    key="join_download_csv"
+                                    label="Download JSON",
+                                    data=to_json_bytes(results),
+                                    file_name="join_results.json",
+                                    mime="application/json",
+                                    key="join_download_json"
                                 )
+                            
+                            with col2:
+                                # CSV uses the flattened format
+                                if results:
+                                    df_join = pd.DataFrame(flatten_join_rows(results))
+                                    st.download_button(
+                                        label="Download CSV",
+                                        data=df_join.to_csv(index=False).encode('utf-8'),
+                                        file_name="join_results.csv",
+                                        mime="text/csv",
+                                        key="join_download_csv"
+                                    )
                     
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
@@ -985,6 +1611,7 @@ else:
                 if st.button("Clear Join Results", key="clear_join"):
                     st.session_state.join_results = None
                     st.session_state.use_join_results = False
+                    st.session_state.flattened_join_collection = None
                     st.success("Join results cleared")
                     st.rerun()
         else:
@@ -1002,10 +1629,11 @@ else:
         )
         
         if analysis_type == "Overview":
-            sample_doc = collection.data[0] if collection.data else {}
+            # head/count do not flatten a whole join result just for the overview
+            sample_doc = collection.head(1)[0] if collection.count() else {}
             
             col1, col2, col3 = st.columns(3)
-            col1.metric("Records", len(collection.data))
+            col1.metric("Records", collection.count())
             col2.metric("Fields", len(sample_doc))
             col3.metric("Type", "JSON")
             
@@ -1040,12 +1668,9 @@ else:
                     if not field_to_analyze:
                         st.warning("Please select a field")
                     else:
-                        counts = collection.aggregate(field_to_analyze, agg_count())
+                        counts = collection.aggregate_counter(field_to_analyze)
                     
-                        df = pd.DataFrame([
-                            {"Value": k, "Count": v}
-                            for k, v in counts.items()
-                        ]).sort_values("Count", ascending=False)
+                        df = pd.DataFrame(counts.most_common(20), columns=["Value", "Count"])
                         
                         st.dataframe(df.head(20), use_container_width=True)
                         st.bar_chart(df.head(10).set_index("Value"))
@@ -1065,40 +1690,26 @@ else:
                 st.caption("Uses chunk processing for large files")
                 st.caption("Processes file in chunks and merges partial results")
             
-            # Get file path from session state or allow upload
-            file_to_process = None
-            temp_file_created = False
+            # Records come straight from the loaded collection, or the uploaded bytes are
+            # parsed chunk by chunk; no temp files
+            records = None
+            uploaded_analysis_file = None
             
             if st.session_state.data_loaded and st.session_state.collection:
                 use_current = st.checkbox("Use currently loaded data", value=True)
                 if use_current:
-                    # Save current data to temp file for processing
-                    import tempfile
-                    temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.jsonl', delete=False, encoding='utf-8')
-                    for doc in st.session_state.collection.data:
-                        temp_file.write(json.dumps(doc, ensure_ascii=False) + '\n')
-                    temp_file.close()
-                    file_to_process = temp_file.name
-                    temp_file_created = True
+                    records = st.session_state.collection.data
                 else:
                     uploaded_analysis_file = st.file_uploader("Or upload a file", type=['json', 'jsonl'], key="engagement_file")
-                    if uploaded_analysis_file:
-                        temp_path = f"temp_engagement_{uploaded_analysis_file.name}"
-                        with open(temp_path, "wb") as f:
-                            f.write(uploaded_analysis_file.getbuffer())
-                        file_to_process = temp_path
             else:
                 uploaded_analysis_file = st.file_uploader("Upload a file", type=['json', 'jsonl'], key="engagement_file")
-                if uploaded_analysis_file:
-                    temp_path = f"temp_engagement_{uploaded_analysis_file.name}"
-                    with open(temp_path, "wb") as f:
-                        f.write(uploaded_analysis_file.getbuffer())
-                    file_to_process = temp_path
+            has_source = records is not None or uploaded_analysis_file is not None
             
-            if file_to_process and st.button("Calculate", type="primary", key="engagement_calculate"):
+            if has_source and st.button("Calculate", type="primary", key="engagement_calculate"):
                 try:
                     with st.spinner("Processing chunks..."):
-                        results = calculate_average_engagement_by_location(file_to_process, chunk_size)
+                        source = records if records is not None else uploaded_analysis_file.getvalue()
+                        results = calculate_average_engagement_by_location(source, chunk_size)
                     
                     if results:
                         # Convert to DataFrame
@@ -1131,16 +1742,11 @@ else:
                             file_name="engagement_by_location.csv",
                             mime="text/csv"
                         )
-                    
-                    # Cleanup temp file if created
-                    if temp_file_created and os.path.exists(file_to_process):
-                        os.unlink(file_to_process)
                         
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
-                    import traceback
                     st.code(traceback.format_exc())
-            elif not file_to_process:
+            elif not has_source:
                 st.info("Please load data first or upload a file")
 
 # Footer